@@ -1,9 +1,17 @@
-from flask import Flask, jsonify, request
+from flask import Flask, request
 from flask_cors import CORS
 import feedparser
 import requests
+import aiohttp
+import asyncio
+import calendar
+from dataclasses import dataclass
 from datetime import datetime
 import json
+import threading
+import time
+from newscommon.search import build_search_index
+from newscommon.web import fetch_feed, json_response, to_public
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS
@@ -19,21 +27,67 @@ RSS_FEEDS = [
     'https://www.wired.com/feed/category/ai/latest/rss'
 ]
 
-def scrape_rss_feed(feed_url):
+@dataclass
+class Article:
+    """A scraped article; title_lc/summary_lc are lowercased copies used by search"""
+    __slots__ = ('id', 'title', 'summary', 'content', 'link', 'source', 'published',
+                 'published_ts', 'title_lc', 'summary_lc')
+    id: int
+    title: str
+    summary: str
+    content: str
+    link: str
+    source: str
+    published: str
+    published_ts: float  # Epoch seconds, so sorting compares numbers rather than date strings
+    title_lc: str
+    summary_lc: str
+
+# Last fetched article list, reused until it is older than _CACHE_TTL seconds
+_CACHE_TTL = 300
+_cache = {'ts': 0, 'data': [], 'index': None}
+_cache_lock = threading.Lock()
+
+# Per feed URL: the ETag / Last-Modified validators from the last successful fetch
+# and the articles parsed from it, reused whenever the feed answers 304
+FEED_STATE = {}
+
+async def fetch_all_feeds():
+    # Download every feed over one event loop so network waits overlap
+    connector = aiohttp.TCPConnector(limit=16)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[fetch_feed(session, feed_url, FEED_STATE.get(feed_url, {})) for feed_url in RSS_FEEDS],
+            return_exceptions=True
+        )
+
+def scrape_rss_feed(feed_url, content):
     try:
-        feed = feedparser.parse(feed_url)
+        feed = feedparser.parse(content)
         articles = []
+        source = feed.feed.get('title', 'Unknown')
         
         for entry in feed.entries[:5]:
-            article = {
-                'id': abs(hash(entry.link)) % (10 ** 8),
-                'title': entry.get('title', 'No title'),
-                'summary': entry.get('summary', entry.get('description', ''))[:300],
-                'content': entry.get('content', [{'value': ''}])[0].get('value', '')[:500] if hasattr(entry, 'content') else entry.get('summary', '')[:500],
-                'link': entry.link,
-                'source': feed.feed.get('title', 'Unknown'),
-                'published': entry.get('published', datetime.now().isoformat())
-            }
+            # Look each field up once; FeedParserDict lookups resolve key aliases every time
+            link = entry.link
+            title = entry.get('title', 'No title')
+            raw_summary = entry.get('summary') or entry.get('description') or ''
+            content_list = entry.get('content')
+            content = content_list[0].get('value', '') if content_list else raw_summary
+            summary = raw_summary[:300]
+            published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+            article = Article(
+                id=abs(hash(link)) % (10 ** 8),
+                title=title,
+                summary=summary,
+                content=content[:500],
+                link=link,
+                source=source,
+                published=entry.get('published', datetime.now().isoformat()),
+                published_ts=calendar.timegm(published_parsed) if published_parsed else 0,  # Undated entries sort last
+                title_lc=title.lower(),
+                summary_lc=summary.lower()
+            )
             articles.append(article)
         
         return articles
@@ -42,16 +96,69 @@ def scrape_rss_feed(feed_url):
         return []
 
 def fetch_all_news():
+    """Return the cached articles, refreshing them first once they are stale"""
+    if time.time() - _cache['ts'] < _CACHE_TTL:
+        return _cache['data']
+    
+    # Refresh inside the request: Vercel freezes the instance once a response is sent,
+    # so a background thread would not finish. One request waits for the feeds;
+    # the rest serve the stale list unless there is none yet.
+    if not _cache_lock.acquire(blocking=not _cache['ts']):
+        return _cache['data']
+    try:
+        if time.time() - _cache['ts'] >= _CACHE_TTL:
+            _refresh_cache()
+        return _cache['data']
+    finally:
+        _cache_lock.release()
+
+def _refresh_cache():
+    """Re-fetch every feed into _cache"""
+    try:
+        all_articles = _fetch_all_news()
+        _cache['index'] = build_search_index(all_articles)
+        _cache['data'] = all_articles
+        _cache['ts'] = time.time()
+    except Exception as e:
+        print(f"Error refreshing news: {str(e)}")
+
+def _fetch_all_news():
     all_articles = []
-    for feed_url in RSS_FEEDS:
-        articles = scrape_rss_feed(feed_url)
+    fetched = 0
+    results = asyncio.run(fetch_all_feeds())
+    for feed_url, result in zip(RSS_FEEDS, results):
+        if isinstance(result, Exception):
+            print(f"Error scraping {feed_url}: {str(result)}")
+            articles = []
+        elif result is None:
+            # Not modified: reuse the articles parsed from the previous response
+            articles = FEED_STATE[feed_url]['articles']
+        else:
+            content, validators = result
+            articles = scrape_rss_feed(feed_url, content)
+            if articles:
+                FEED_STATE[feed_url] = dict(validators, articles=articles)
+        if articles:
+            fetched += 1
+        else:
+            # Failed feed: keep serving what it returned last time, if anything
+            articles = FEED_STATE.get(feed_url, {}).get('articles', [])
         all_articles.extend(articles)
     
+    if not fetched:
+        raise RuntimeError('no feed could be fetched')
+    
+    # Feeds sometimes carry the same story; keep the first copy of each link
+    seen_links = set()
+    unique_articles = []
+    for article in all_articles:
+        if article.link not in seen_links:
+            seen_links.add(article.link)
+            unique_articles.append(article)
+    all_articles = unique_articles
+    
     # Sort by published date
-    try:
-        all_articles.sort(key=lambda x: x['published'], reverse=True)
-    except:
-        pass
+    all_articles.sort(key=lambda x: x.published_ts, reverse=True)
     
     return all_articles
 
@@ -60,33 +167,33 @@ def get_news():
     try:
         articles = fetch_all_news()
         per_page = int(request.args.get('per_page', 50))
-        return jsonify({
-            'articles': articles[:per_page],
+        return json_response({
+            'articles': [to_public(a) for a in articles[:per_page]],
             'total': len(articles)
         })
     except Exception as e:
-        return jsonify({'error': str(e), 'articles': [], 'total': 0}), 200
+        return json_response({'error': str(e), 'articles': [], 'total': 0}), 200
 
 @app.route('/api/sources', methods=['GET'])
 def get_sources():
     try:
         articles = fetch_all_news()
-        sources = list(set([a['source'] for a in articles]))
-        return jsonify({'sources': sources})
+        sources = list(set([a.source for a in articles]))
+        return json_response({'sources': sources})
     except Exception as e:
-        return jsonify({'sources': [], 'error': str(e)}), 200
+        return json_response({'sources': [], 'error': str(e)}), 200
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     try:
         articles = fetch_all_news()
-        sources = list(set([a['source'] for a in articles]))
-        return jsonify({
+        sources = list(set([a.source for a in articles]))
+        return json_response({
             'total_articles': len(articles),
             'total_sources': len(sources)
         })
     except Exception as e:
-        return jsonify({'total_articles': 0, 'total_sources': 0}), 200
+        return json_response({'total_articles': 0, 'total_sources': 0}), 200
 
 @app.route('/api/news/search', methods=['GET'])
 def search_news():
@@ -95,15 +202,16 @@ def search_news():
         if not query:
             return get_news()
         
-        articles = fetch_all_news()
-        filtered = [
-            a for a in articles 
-            if query in a['title'].lower() or query in a.get('summary', '').lower()
-        ]
+        fetch_all_news()
+        index = _cache['index']
+        filtered = [index['articles'][i] for i in index['search'](query)]
         
-        return jsonify({
-            'articles': filtered,
+        return json_response({
+            'articles': [to_public(a) for a in filtered],
             'total': len(filtered)
         })
     except Exception as e:
-        return jsonify({'articles': [], 'total': 0}), 200
+        return json_response({'articles': [], 'total': 0}), 200
+
+# Populate the cache at cold start so requests are served from memory
+_refresh_cache()
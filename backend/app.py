@@ -1,18 +1,63 @@
-from flask import Flask, jsonify, request
+from flask import Flask, request
 from flask_cors import CORS
 import feedparser
-import requests
+import orjson
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import threading
-import time
-import schedule
 import os
+import sys
+import asyncio
+import aiohttp
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import calendar
+
+# The search and response helpers live in the repo-root newscommon package, shared with api/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from newscommon.search import build_search_index
+from newscommon.web import fetch_feed, json_response, to_public
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# In-memory storage for news articles
-news_storage = []
+@dataclass
+class Article:
+    """A scraped article; title_lc/summary_lc are lowercased copies used by search"""
+    __slots__ = ('id', 'title', 'summary', 'content', 'link', 'published', 'published_ts',
+                 'source', 'scraped_at', 'title_lc', 'summary_lc')
+    id: int
+    title: str
+    summary: str
+    content: str
+    link: str
+    published: str
+    published_ts: float  # Epoch seconds, so sorting compares numbers rather than date strings
+    source: str
+    scraped_at: str
+    title_lc: str
+    summary_lc: str
+
+# In-memory storage for news articles, keyed by article id. Readers iterate over
+# a list(news_storage.values()) snapshot since the scraper thread mutates the dict.
+news_storage = {}
+storage_lock = threading.Lock()  # Guards news_storage against concurrent scrapes
+seen_links = set()  # Links of every stored article, for O(1) duplicate checks
+sample_ids = set()  # Ids of the placeholder articles, dropped once a scrape finds real ones
+
+# news_storage is saved here after every scrape and reloaded at startup, so a restart
+# serves the previous articles instead of waiting on the feeds
+STORAGE_PATH = os.environ.get(
+    'NEWS_STORAGE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_storage.json')
+)
+
+# Inverted index over news_storage used by search_news, rebuilt after every scrape
+# (and first built when the sample articles are loaded)
+search_index = None
+
+# Sorted copies of news_storage keyed by (sort field, reverse), cleared after every scrape
+sorted_cache = {}
+SORT_FIELDS = {'published': 'published_ts'}  # Sort on the epoch, not the date string
 
 # RSS feeds for AI news sources
 RSS_FEEDS = [
@@ -25,87 +70,160 @@ RSS_FEEDS = [
     'https://www.wired.com/feed/category/ai/latest/rss'
 ]
 
-def fetch_article_content(url):
+# ETag / Last-Modified per feed URL, sent back so unchanged feeds answer 304
+FEED_STATE = {}
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+async def fetch_article_content(session, semaphore, url):
     """Fetch article content from URL"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        return response.text[:500] + "..."  # First 500 chars as preview
-    except:
+        async with semaphore:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                text = await response.text()
+        return text[:500] + "..."  # First 500 chars as preview
+    except Exception:
         return ""
 
-def scrape_rss_feed(feed_url):
-    """Scrape a single RSS feed"""
+def scrape_rss_feed(feed_url, content, validators, scraped_links):
+    """Parse a downloaded RSS feed into new articles, skipping links in scraped_links"""
     try:
-        feed = feedparser.parse(feed_url)
+        feed = feedparser.parse(content)
         articles = []
+        source = feed.feed.get('title', 'Unknown Source')
+        now_str = str(datetime.now())
         
         for entry in feed.entries[:10]:  # Limit to 10 most recent
             # Check if article already exists
-            existing = next((a for a in news_storage if a['link'] == entry.link), None)
-            if existing:
+            link = entry.link
+            if link in seen_links or link in scraped_links:
                 continue
+            scraped_links.add(link)  # Another feed in this scrape may carry the same story
                 
-            article = {
-                'id': hash(entry.link),  # Simple ID generation
-                'title': entry.title,
-                'summary': entry.summary if hasattr(entry, 'summary') else '',
-                'content': fetch_article_content(entry.link) if len(news_storage) < 50 else '',  # Limit content fetches
-                'link': entry.link,
-                'published': entry.published if hasattr(entry, 'published') else str(datetime.now()),
-                'source': feed.feed.title if hasattr(feed, 'feed') and hasattr(feed.feed, 'title') else 'Unknown Source',
-                'scraped_at': str(datetime.now())
-            }
+            title = entry.get('title', 'No title')
+            summary = entry.get('summary', '')
+            published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+            article = Article(
+                id=hash(link),  # Simple ID generation
+                title=title,
+                summary=summary,
+                content='',  # Filled in by async_scrape_all_feeds once every feed is parsed
+                link=link,
+                published=entry.get('published') or now_str,
+                published_ts=calendar.timegm(published_parsed) if published_parsed else 0,  # Undated entries sort last
+                source=source,
+                scraped_at=now_str,
+                title_lc=title.lower(),
+                summary_lc=summary.lower()
+            )
             articles.append(article)
         
+        # Only remember validators once the feed has been processed successfully
+        FEED_STATE[feed_url] = validators
         return articles
     except Exception as e:
         print(f"Error scraping {feed_url}: {str(e)}")
         return []
 
-def scrape_all_feeds():
+async def async_scrape_all_feeds():
     """Scrape all RSS feeds"""
+    global search_index
     print("Starting news scraping...")
     all_articles = []
+    scraped_links = set()  # Links accepted so far in this scrape; the first copy wins
     
-    for feed_url in RSS_FEEDS:
-        articles = scrape_rss_feed(feed_url)
-        all_articles.extend(articles)
-        print(f"Scraped {len(articles)} articles from {feed_url}")
-    
-    # Update storage with new articles
-    for article in all_articles:
-        # Check if article already exists
-        existing_index = next((i for i, a in enumerate(news_storage) if a['id'] == article['id']), None)
-        if existing_index is not None:
-            # Update existing article
-            news_storage[existing_index] = article
-        else:
-            # Add new article
-            news_storage.append(article)
+    # Download every feed and article body over one aiohttp session so network waits overlap
+    connector = aiohttp.TCPConnector(limit=16)
+    async with aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT}) as session:
+        results = await asyncio.gather(
+            *[fetch_feed(session, feed_url, FEED_STATE.get(feed_url, {})) for feed_url in RSS_FEEDS],
+            return_exceptions=True
+        )
+        for feed_url, result in zip(RSS_FEEDS, results):
+            if isinstance(result, Exception):
+                print(f"Error scraping {feed_url}: {str(result)}")
+                continue
+            if result is None:
+                print(f"No changes in {feed_url} since the last scrape")
+                continue
+            articles = scrape_rss_feed(feed_url, *result, scraped_links)
+            all_articles.extend(articles)
+            print(f"Scraped {len(articles)} articles from {feed_url}")
+        
+        # Fetch article bodies concurrently once every feed is parsed, at most 16 at a time
+        if len(news_storage) < 50:  # Limit content fetches
+            to_fetch = all_articles[:50]
+            semaphore = asyncio.Semaphore(16)
+            bodies = await asyncio.gather(
+                *[fetch_article_content(session, semaphore, a.link) for a in to_fetch]
+            )
+            for article, body in zip(to_fetch, bodies):
+                article.content = body
     
-    # Keep only the 100 most recent articles
-    news_storage.sort(key=lambda x: x['published'], reverse=True)
-    del news_storage[100:]
+    with storage_lock:
+        # Real articles replace the placeholders, so they never reach the snapshot
+        if all_articles:
+            for article_id in sample_ids:
+                article = news_storage.pop(article_id, None)
+                if article is not None:
+                    seen_links.discard(article.link)
+            sample_ids.clear()
+        
+        # Add new articles, replacing any existing article with the same id
+        for article in all_articles:
+            news_storage[article.id] = article
+            seen_links.add(article.link)
+        
+        # Keep only the 100 most recent articles
+        by_recency = sorted(news_storage.values(), key=lambda x: x.published_ts, reverse=True)
+        for article in by_recency[100:]:
+            del news_storage[article.id]
+            seen_links.discard(article.link)
+        search_index = build_search_index(by_recency[:100])
+        # The default newest-first order was just computed, so seed it
+        sorted_cache.clear()
+        sorted_cache[('published_ts', True)] = by_recency[:100]
     
     print(f"Updated news storage with {len(all_articles)} new articles. Total: {len(news_storage)} articles.")
+    save_storage(by_recency[:100])
 
-def run_scheduler():
-    """Run the scheduler in a separate thread"""
-    def job():
-        scrape_all_feeds()
-    
-    # Schedule the job to run every hour
-    schedule.every().hour.do(job)
-    
-    # Run the initial job
-    job()
+def save_storage(articles):
+    """Write articles to STORAGE_PATH, replacing the previous snapshot atomically"""
+    tmp_path = STORAGE_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(articles))
+        os.replace(tmp_path, STORAGE_PATH)
+    except OSError as e:
+        print(f"Error saving news storage to {STORAGE_PATH}: {str(e)}")
+
+def load_storage():
+    """Fill news_storage from the snapshot at STORAGE_PATH, if there is one"""
+    global search_index
+    try:
+        with open(STORAGE_PATH, 'rb') as f:
+            articles = [Article(**data) for data in orjson.loads(f.read())]
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        print(f"Error loading news storage from {STORAGE_PATH}: {str(e)}")
+        return
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    for article in articles:
+        news_storage[article.id] = article
+        seen_links.add(article.link)
+    search_index = build_search_index(articles)
+    print(f"Loaded {len(articles)} articles from {STORAGE_PATH}")
+
+def start_scheduler():
+    """Run the hourly scrape on an AsyncIOScheduler in a background event loop"""
+    loop = asyncio.new_event_loop()
+    scheduler = AsyncIOScheduler(event_loop=loop)
+    # Schedule the job to run every hour, starting right away
+    scheduler.add_job(async_scrape_all_feeds, 'interval', hours=1, next_run_time=datetime.now())
+    loop.call_soon(scheduler.start)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return scheduler
 
 @app.route('/api/news', methods=['GET'])
 def get_news():
@@ -113,8 +231,14 @@ def get_news():
     sort_by = request.args.get('sort', 'published')  # Default sort by published date
     order = request.args.get('order', 'desc')  # Default order descending
     
-    # Sort the news
-    sorted_news = sorted(news_storage, key=lambda x: x[sort_by], reverse=(order == 'desc'))
+    # Sort the news, reusing the sorted copy from an earlier request when possible
+    sort_field = SORT_FIELDS.get(sort_by, sort_by)
+    cache_key = (sort_field, order == 'desc')
+    sorted_news = sorted_cache.get(cache_key)
+    if sorted_news is None:
+        with storage_lock:  # So a concurrent scrape can't leave a stale entry behind
+            sorted_news = sorted(news_storage.values(), key=lambda x: getattr(x, sort_field), reverse=(order == 'desc'))
+            sorted_cache[cache_key] = sorted_news
     
     # Pagination
     page = int(request.args.get('page', 1))
@@ -122,9 +246,9 @@ def get_news():
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
     
-    paginated_news = sorted_news[start_idx:end_idx]
+    paginated_news = [to_public(a) for a in sorted_news[start_idx:end_idx]]
     
-    return jsonify({
+    return json_response({
         'articles': paginated_news,
         'total': len(sorted_news),
         'page': page,
@@ -135,42 +259,45 @@ def get_news():
 @app.route('/api/news/search', methods=['GET'])
 def search_news():
     """Search news articles by keyword"""
-    query = request.args.get('q', '')
+    query = request.args.get('q', '').lower()
     if not query:
-        return jsonify({'articles': [], 'total': 0})
+        return json_response({'articles': [], 'total': 0})
     
-    filtered_articles = [
-        article for article in news_storage 
-        if query.lower() in article['title'].lower() or query.lower() in article['summary'].lower()
-    ]
+    index = search_index
+    filtered_articles = [index['articles'][i] for i in index['search'](query)]
     
-    return jsonify({
-        'articles': filtered_articles,
+    return json_response({
+        'articles': [to_public(a) for a in filtered_articles],
         'total': len(filtered_articles)
     })
 
 @app.route('/api/sources', methods=['GET'])
 def get_sources():
     """Get list of sources"""
-    sources = list(set(article['source'] for article in news_storage))
-    return jsonify({'sources': sources})
+    sources = list(set(article.source for article in list(news_storage.values())))
+    return json_response({'sources': sources})
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get statistics about the news"""
     total_articles = len(news_storage)
-    sources = list(set(article['source'] for article in news_storage))
+    sources = list(set(article.source for article in list(news_storage.values())))
     
-    return jsonify({
+    return json_response({
         'total_articles': total_articles,
         'total_sources': len(sources),
         'sources': sources
     })
 
+# Start from the articles saved by the previous run, if any
+load_storage()
+
 # Initialize with sample data if storage is empty
 if not news_storage:
     print("Initializing with sample articles...")
     from datetime import datetime
+    # published_ts 0 sorts the placeholders after every real article until the
+    # first scrape replaces them
     sample_articles = [
         {
             'id': 1,
@@ -179,6 +306,7 @@ if not news_storage:
             'content': 'The new model architecture introduces several innovations including sparse attention mechanisms, dynamic routing, and improved parameter efficiency. Early tests show 40% reduction in computational requirements with equivalent performance to current state-of-the-art models.',
             'link': 'https://example-ai-news.com/new-architecture',
             'published': str(datetime.now()),
+            'published_ts': 0,
             'source': 'AI Research Today',
             'scraped_at': str(datetime.now())
         },
@@ -189,6 +317,7 @@ if not news_storage:
             'content': 'This advancement represents a significant leap in artificial general intelligence, with applications spanning autonomous systems, content creation, and scientific research. The system demonstrates remarkable capabilities in cross-modal understanding and generation.',
             'link': 'https://example-ai-news.com/multimodal-ai',
             'published': str(datetime.now()),
+            'published_ts': 0,
             'source': 'AI Technology News',
             'scraped_at': str(datetime.now())
         },
@@ -199,26 +328,29 @@ if not news_storage:
             'content': 'The model was tested across diverse domains including mathematics, science, law, and medicine, consistently achieving scores comparable to human experts. This breakthrough has implications for automation across many professional fields.',
             'link': 'https://example-ai-news.com/human-level-reasoning',
             'published': str(datetime.now()),
+            'published_ts': 0,
             'source': 'Deep Learning Daily',
             'scraped_at': str(datetime.now())
         }
     ]
     
-    for article in sample_articles:
-        news_storage.append(article)
+    for sample in sample_articles:
+        article = Article(**sample, title_lc=sample['title'].lower(), summary_lc=sample['summary'].lower())
+        news_storage[article.id] = article
+        seen_links.add(article.link)
+        sample_ids.add(article.id)
+    search_index = build_search_index(list(news_storage.values()))
     
     print(f"Initialized with {len(sample_articles)} sample articles")
 
-# Run an immediate scrape on startup to populate with real data
-print("Running initial news scrape on startup...")
-scrape_all_feeds()
-print(f"Initial scrape completed. Total articles: {len(news_storage)}")
+# Scrape in the background (immediately, then hourly); requests are served from
+# the loaded snapshot or sample articles in the meantime
+scheduler = start_scheduler()
 
+# In production, serve with a threaded WSGI server so scrapes never block requests:
+#   gunicorn -k gthread --workers 1 --threads 8 --bind 0.0.0.0:$PORT app:app
+# A single worker keeps one news_storage (and one scheduler) per deployment.
 if __name__ == '__main__':
-    # Start the scheduler in a separate thread
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    
-    # Run the Flask app
+    # Local development only
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1 @@
+# Helpers shared by the Vercel API handler (api/news.py) and the Flask backend (backend/app.py)
@@ -0,0 +1,62 @@
+from functools import lru_cache, partial
+import ahocorasick
+
+def trigrams(text):
+    """Every 3-character substring of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def build_search_index(articles):
+    """Build an inverted index from each title/summary trigram to article ids"""
+    postings = {}
+    for article in articles:
+        for gram in trigrams(article.title_lc) | trigrams(article.summary_lc):
+            postings.setdefault(gram, set()).add(article.id)
+    index = {
+        'postings': postings,
+        'articles': {a.id: a for a in articles},
+        'rank': {a.id: i for i, a in enumerate(articles)}
+    }
+    # Memoized query -> ids lookup; every rebuilt index starts with an empty cache
+    index['search'] = lru_cache(maxsize=512)(partial(match_ids, index))
+    return index
+
+def search_candidates(index, terms):
+    """Articles containing every trigram of each term, in index order"""
+    postings = index['postings']
+    # A term occurs in a text only if all of its trigrams do; terms shorter than
+    # three characters have none and are left to the substring check
+    grams = set().union(*(trigrams(term) for term in terms))
+    if not grams:
+        return list(index['articles'].values())
+    hits = sorted((postings.get(gram, set()) for gram in grams), key=len)
+    ids = hits[0].intersection(*hits[1:])
+    return [index['articles'][i] for i in sorted(ids, key=index['rank'].__getitem__)]
+
+def build_matcher(terms):
+    """Compile search terms into an Aho-Corasick automaton"""
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+def matches_all_terms(automaton, terms, article):
+    """True if every term occurs in the article's title or summary"""
+    found = set()
+    for text in (article.title_lc, article.summary_lc):
+        for _, term in automaton.iter(text):
+            found.add(term)
+            if len(found) == len(terms):
+                return True
+    return False
+
+def match_ids(index, query):
+    """Ids of the indexed articles matching every term of query, in index order"""
+    terms = set(query.split())
+    # The index narrows to likely hits; confirm each term actually occurs
+    candidates = search_candidates(index, terms)
+    if len(terms) > 1:
+        # Multi-word queries: one pass per text matches all terms at once
+        matcher = build_matcher(terms)
+        return tuple(a.id for a in candidates if matches_all_terms(matcher, terms, a))
+    return tuple(a.id for a in candidates if query in a.title_lc or query in a.summary_lc)
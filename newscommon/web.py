@@ -0,0 +1,31 @@
+from dataclasses import asdict
+from flask import Response
+import aiohttp
+import orjson
+
+def json_response(data, status=200):
+    """Like jsonify, but encoded with orjson"""
+    return Response(orjson.dumps(data), status=status, mimetype='application/json')
+
+def to_public(article):
+    """Serialize an article for a response, leaving out the search-only fields"""
+    data = asdict(article)
+    del data['title_lc'], data['summary_lc']
+    return data
+
+async def fetch_feed(session, feed_url, state):
+    """Conditionally GET a feed using the validators in state
+
+    Returns None if the feed is unchanged (304), else (content, validators).
+    """
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('modified'):
+        headers['If-Modified-Since'] = state['modified']
+    async with session.get(feed_url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        if response.status == 304:
+            return None
+        response.raise_for_status()
+        content = await response.read()
+        return content, {'etag': response.headers.get('ETag'), 'modified': response.headers.get('Last-Modified')}